@@ -6,137 +6,137 @@ This script populates the database with sample chefs, pizzas, images, and review
 for testing purposes. Run this after the main database is initialized.
 """
 
+from sqlalchemy import insert, text
+
 from src.db import db_manager, Chef, Pizza, PizzaImage, ReviewCategory, PizzaReview, PizzaReviewScore
 
 def seed_dummy_data():
     """Seed the database with dummy test data"""
-    session = db_manager.get_session()
+    print("Seeding dummy data...")
     try:
-        print("Seeding dummy data...")
-        
-        # Check if we already have dummy data
-        if session.query(Chef).count() > 0:
-            print("Dummy data already exists. Clearing existing data...")
-            # Clear existing data in proper order (respecting foreign keys)
-            session.query(PizzaReviewScore).delete()
-            session.query(PizzaReview).delete()
-            session.query(PizzaImage).delete()
-            session.query(Pizza).delete()
-            session.query(Chef).delete()
-            session.commit()
-        
-        # Create sample chefs
-        chefs = [
-            Chef(name="Mario Rossi", image_path="/images/chefs/mario.jpg"),
-            Chef(name="Luigi Bianchi", image_path="/images/chefs/luigi.jpg"),
-            Chef(name="Giuseppe Verde", image_path="/images/chefs/giuseppe.jpg"),
-            Chef(name="Antonio Napoli", image_path="/images/chefs/antonio.jpg"),
-        ]
-        
-        session.add_all(chefs)
-        session.commit()
-        print(f"Created {len(chefs)} dummy chefs")
-        
-        # Create sample pizzas
-        pizzas = [
-            Pizza(chef_id=1),  # Mario's pizzas
-            Pizza(chef_id=1),
-            Pizza(chef_id=2),  # Luigi's pizza
-            Pizza(chef_id=3),  # Giuseppe's pizza
-            Pizza(chef_id=4),  # Antonio's pizza
-        ]
-        
-        session.add_all(pizzas)
-        session.commit()
-        print(f"Created {len(pizzas)} dummy pizzas")
-        
-        # Create sample pizza images
-        pizza_images = [
-            # Pizza 1 (Mario's first pizza)
-            PizzaImage(pizza_id=1, image_path="/images/pizzas/margherita_1.jpg"),
-            PizzaImage(pizza_id=1, image_path="/images/pizzas/margherita_2.jpg"),
+        # Single transaction for the whole seed: committed on exit, rolled back on error
+        with db_manager.get_session() as session, session.begin():
+            # Check if we already have dummy data
+            if session.query(Chef.id).limit(1).scalar() is not None:
+                print("Dummy data already exists. Clearing existing data...")
+                if db_manager.engine.dialect.name == "postgresql":
+                    # Single statement, and resets the ID sequences used below
+                    session.execute(text(
+                        "TRUNCATE pizza_review_scores, pizza_review, pizza_images, pizzas, chefs "
+                        "RESTART IDENTITY CASCADE"
+                    ))
+                else:
+                    # Clear existing data in proper order (respecting foreign keys)
+                    session.query(PizzaReviewScore).delete()
+                    session.query(PizzaReview).delete()
+                    session.query(PizzaImage).delete()
+                    session.query(Pizza).delete()
+                    session.query(Chef).delete()
             
-            # Pizza 2 (Mario's second pizza)
-            PizzaImage(pizza_id=2, image_path="/images/pizzas/pepperoni_1.jpg"),
+            # Create sample chefs
+            chefs = [
+                {"name": "Mario Rossi", "image_path": "/images/chefs/mario.jpg"},
+                {"name": "Luigi Bianchi", "image_path": "/images/chefs/luigi.jpg"},
+                {"name": "Giuseppe Verde", "image_path": "/images/chefs/giuseppe.jpg"},
+                {"name": "Antonio Napoli", "image_path": "/images/chefs/antonio.jpg"},
+            ]
             
-            # Pizza 3 (Luigi's pizza)
-            PizzaImage(pizza_id=3, image_path="/images/pizzas/quattro_stagioni.jpg"),
+            session.execute(insert(Chef), chefs)
+            print(f"Created {len(chefs)} dummy chefs")
             
-            # Pizza 4 (Giuseppe's pizza)
-            PizzaImage(pizza_id=4, image_path="/images/pizzas/capricciosa.jpg"),
+            # Create sample pizzas
+            pizzas = [
+                {"chef_id": 1},  # Mario's pizzas
+                {"chef_id": 1},
+                {"chef_id": 2},  # Luigi's pizza
+                {"chef_id": 3},  # Giuseppe's pizza
+                {"chef_id": 4},  # Antonio's pizza
+            ]
             
-            # Pizza 5 (Antonio's pizza)
-            PizzaImage(pizza_id=5, image_path="/images/pizzas/napoletana.jpg"),
-        ]
-        
-        session.add_all(pizza_images)
-        session.commit()
-        print(f"Created {len(pizza_images)} dummy pizza images")
-        
-        # Get review categories
-        categories = session.query(ReviewCategory).all()
-        category_map = {cat.name: cat.id for cat in categories}
-        
-        # Create sample reviews with scores
-        reviews_data = [
-            {
-                "pizza_id": 1,
-                "summary": "ANALYSIS COMPLETE: Margherita shows acceptable roundness but crust execution is subpar. Cheese distribution exhibits minor irregularities. VERDICT: Mediocre attempt.",
-                "scores": {"Roundness": 4, "Crust Quality": 3, "Topping Distribution": 3, "Color Appeal": 4, "Estimated Taste": 3, "Overall Presentation": 3}
-            },
-            {
-                "pizza_id": 2,
-                "summary": "PEPPERONI DETECTED: Circular formation adequate. Grease levels within acceptable parameters. However, pepperoni placement shows human inconsistency. DISAPPOINTING.",
-                "scores": {"Roundness": 3, "Crust Quality": 4, "Topping Distribution": 2, "Color Appeal": 3, "Estimated Taste": 4, "Overall Presentation": 3}
-            },
-            {
-                "pizza_id": 3,
-                "summary": "QUATTRO STAGIONI ANALYSIS: Ambitious attempt detected. Multiple toppings create visual chaos but demonstrate culinary courage. Surprisingly competent execution.",
-                "scores": {"Roundness": 4, "Crust Quality": 4, "Topping Distribution": 4, "Color Appeal": 5, "Estimated Taste": 4, "Overall Presentation": 4}
-            },
-            {
-                "pizza_id": 4,
-                "summary": "CAPRICCIOSA EVALUATION: Traditional approach noted. Execution meets baseline standards but lacks innovation. PIZZATRON expects more creativity.",
-                "scores": {"Roundness": 3, "Crust Quality": 3, "Topping Distribution": 3, "Color Appeal": 3, "Estimated Taste": 3, "Overall Presentation": 3}
-            },
-            {
-                "pizza_id": 5,
-                "summary": "NAPOLETANA SPECIMEN: Excellent crust charring detected. Minimal toppings demonstrate confidence in fundamentals. IMPRESSIVE RESTRAINT. Well executed.",
-                "scores": {"Roundness": 5, "Crust Quality": 5, "Topping Distribution": 5, "Color Appeal": 4, "Estimated Taste": 5, "Overall Presentation": 5}
-            }
-        ]
-        
-        for review_data in reviews_data:
-            # Create pizza review
-            pizza_review = PizzaReview(
-                pizza_id=review_data["pizza_id"],
-                review_summary=review_data["summary"]
-            )
-            session.add(pizza_review)
-            session.commit()
-            session.refresh(pizza_review)
+            session.execute(insert(Pizza), pizzas)
+            print(f"Created {len(pizzas)} dummy pizzas")
+            
+            # Create sample pizza images
+            pizza_images = [
+                # Pizza 1 (Mario's first pizza)
+                {"pizza_id": 1, "image_path": "/images/pizzas/margherita_1.jpg"},
+                {"pizza_id": 1, "image_path": "/images/pizzas/margherita_2.jpg"},
+            
+                # Pizza 2 (Mario's second pizza)
+                {"pizza_id": 2, "image_path": "/images/pizzas/pepperoni_1.jpg"},
+            
+                # Pizza 3 (Luigi's pizza)
+                {"pizza_id": 3, "image_path": "/images/pizzas/quattro_stagioni.jpg"},
+            
+                # Pizza 4 (Giuseppe's pizza)
+                {"pizza_id": 4, "image_path": "/images/pizzas/capricciosa.jpg"},
+            
+                # Pizza 5 (Antonio's pizza)
+                {"pizza_id": 5, "image_path": "/images/pizzas/napoletana.jpg"},
+            ]
+            
+            session.execute(insert(PizzaImage), pizza_images)
+            print(f"Created {len(pizza_images)} dummy pizza images")
+            
+            # Get review categories
+            categories = session.query(ReviewCategory).all()
+            category_map = {cat.name: cat.id for cat in categories}
+            
+            # Create sample reviews with scores
+            reviews_data = [
+                {
+                    "pizza_id": 1,
+                    "summary": "ANALYSIS COMPLETE: Margherita shows acceptable roundness but crust execution is subpar. Cheese distribution exhibits minor irregularities. VERDICT: Mediocre attempt.",
+                    "scores": {"Roundness": 4, "Crust Quality": 3, "Topping Distribution": 3, "Color Appeal": 4, "Estimated Taste": 3, "Overall Presentation": 3}
+                },
+                {
+                    "pizza_id": 2,
+                    "summary": "PEPPERONI DETECTED: Circular formation adequate. Grease levels within acceptable parameters. However, pepperoni placement shows human inconsistency. DISAPPOINTING.",
+                    "scores": {"Roundness": 3, "Crust Quality": 4, "Topping Distribution": 2, "Color Appeal": 3, "Estimated Taste": 4, "Overall Presentation": 3}
+                },
+                {
+                    "pizza_id": 3,
+                    "summary": "QUATTRO STAGIONI ANALYSIS: Ambitious attempt detected. Multiple toppings create visual chaos but demonstrate culinary courage. Surprisingly competent execution.",
+                    "scores": {"Roundness": 4, "Crust Quality": 4, "Topping Distribution": 4, "Color Appeal": 5, "Estimated Taste": 4, "Overall Presentation": 4}
+                },
+                {
+                    "pizza_id": 4,
+                    "summary": "CAPRICCIOSA EVALUATION: Traditional approach noted. Execution meets baseline standards but lacks innovation. PIZZATRON expects more creativity.",
+                    "scores": {"Roundness": 3, "Crust Quality": 3, "Topping Distribution": 3, "Color Appeal": 3, "Estimated Taste": 3, "Overall Presentation": 3}
+                },
+                {
+                    "pizza_id": 5,
+                    "summary": "NAPOLETANA SPECIMEN: Excellent crust charring detected. Minimal toppings demonstrate confidence in fundamentals. IMPRESSIVE RESTRAINT. Well executed.",
+                    "scores": {"Roundness": 5, "Crust Quality": 5, "Topping Distribution": 5, "Color Appeal": 4, "Estimated Taste": 5, "Overall Presentation": 5}
+                }
+            ]
             
-            # Create scores for each category
-            for category_name, score in review_data["scores"].items():
-                if category_name in category_map:
-                    score_record = PizzaReviewScore(
-                        pizza_review_id=pizza_review.id,
-                        category_id=category_map[category_name],
-                        score=score
-                    )
-                    session.add(score_record)
+            # Create all reviews, then read back their IDs keyed by pizza
+            session.execute(insert(PizzaReview), [
+                {"pizza_id": review_data["pizza_id"], "review_summary": review_data["summary"]}
+                for review_data in reviews_data
+            ])
+            review_ids = dict(session.query(PizzaReview.pizza_id, PizzaReview.id).all())
             
-            session.commit()
+            # Create scores for each category in a single bulk insert
+            score_mappings = [
+                {
+                    "pizza_review_id": review_ids[review_data["pizza_id"]],
+                    "category_id": category_map[category_name],
+                    "score": score
+                }
+                for review_data in reviews_data
+                for category_name, score in review_data["scores"].items()
+                if category_name in category_map
+            ]
+            session.execute(insert(PizzaReviewScore), score_mappings)
         
         print(f"Created {len(reviews_data)} dummy reviews with scores")
         print("Dummy data seeding completed successfully!")
         
     except Exception as e:
-        session.rollback()
         print(f"Error seeding dummy data: {e}")
         raise
-    finally:
-        session.close()
 
 
 def main():
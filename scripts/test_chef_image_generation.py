@@ -5,14 +5,17 @@ Shows before/after comparison for multiple test images
 Uses async processing for faster execution
 """
 
+import os
+import sys
+import matplotlib
+# Headless runs only save the figure, so use the non-interactive Agg renderer
+if sys.platform.startswith("linux") and not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")):
+    matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import matplotlib.image as mpimg
 from PIL import Image, ImageOps
 import io
-import os
-import sys
 import asyncio
-import concurrent.futures
 import time
 from pathlib import Path
 
@@ -20,19 +23,29 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 from src.ai import generate_chef_image
 
+# Images are only shown as figure thumbnails
+DISPLAY_MAX_SIZE = (1024, 1024)
+# Concurrent OpenAI requests
+MAX_PARALLEL = int(os.getenv("PIZZATRON_MAX_PARALLEL", "8"))
+
 def load_test_images():
     """Load test images from the chefs directory"""
     # Get the project root directory (parent of scripts)
     project_root = Path(__file__).parent.parent
     chef_images_dir = project_root / "src" / "static" / "images" / "chefs"
     
-    # Look for existing chef images (excluding AI generated ones)
-    image_files = []
-    for ext in ['*.jpg', '*.jpeg', '*.png']:
-        for file in chef_images_dir.glob(ext):
-            # Skip AI-generated images
-            if not file.name.startswith('chef_ai_'):
-                image_files.append(file)
+    if not chef_images_dir.is_dir():
+        return []
+    
+    # Look for existing chef images (excluding AI generated ones) in a single directory scan
+    image_extensions = {'.jpg', '.jpeg', '.png'}
+    image_files = [
+        Path(entry.path)
+        for entry in os.scandir(chef_images_dir)
+        if entry.is_file()
+        and Path(entry.name).suffix.lower() in image_extensions
+        and not entry.name.startswith('chef_ai_')
+    ]
     
     return image_files[:5]  # Take first 5 images
 
@@ -41,7 +54,10 @@ def fix_image_orientation(image_bytes: bytes) -> Image.Image:
     try:
         # Open image and apply EXIF orientation correction
         image = Image.open(io.BytesIO(image_bytes))
+        # Let libjpeg decode at reduced scale - we only need a display-sized copy
+        image.draft("RGB", DISPLAY_MAX_SIZE)
         image = ImageOps.exif_transpose(image)
+        image.thumbnail(DISPLAY_MAX_SIZE, Image.Resampling.LANCZOS)
         
         # Convert to RGB if needed for consistent display
         if image.mode in ('RGBA', 'LA', 'P'):
@@ -63,20 +79,14 @@ def fix_image_orientation(image_bytes: bytes) -> Image.Image:
         # Fallback to basic loading
         return Image.open(io.BytesIO(image_bytes))
 
-async def generate_chef_image_async(image_bytes: bytes, filename: str) -> tuple:
-    """Async wrapper for generate_chef_image function"""
-    loop = asyncio.get_event_loop()
-    
-    def run_generation():
-        try:
-            result = generate_chef_image(image_bytes)
-            return result, None
-        except Exception as e:
-            return None, str(e)
-    
-    # Run the blocking function in a thread pool
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        result, error = await loop.run_in_executor(executor, run_generation)
+async def run_chef_image_generation(image_bytes: bytes, filename: str, semaphore: asyncio.Semaphore) -> tuple:
+    """Run a single chef image generation, capturing any error alongside the result"""
+    try:
+        async with semaphore:
+            result = await generate_chef_image(image_bytes)
+        error = None
+    except Exception as e:
+        result, error = None, str(e)
     
     return filename, result, error
 
@@ -126,17 +136,14 @@ async def test_chef_image_generation_async():
         axes[1, i].set_title('AI Generated - Processing...', fontweight='bold', color='orange', fontsize=10)
         axes[1, i].axis('off')
     
-    # Show the plot with originals and placeholders
-    plt.draw()
-    plt.pause(0.1)
-    
     # Start async processing
     print("🚀 Starting parallel AI image generation...")
     start_time = time.time()
     
-    # Create tasks for all images
+    # Create tasks for all images, with at most MAX_PARALLEL requests in flight
+    semaphore = asyncio.Semaphore(MAX_PARALLEL)
     tasks = [
-        generate_chef_image_async(image_bytes, filename) 
+        run_chef_image_generation(image_bytes, filename, semaphore) 
         for image_bytes, filename in image_bytes_list
     ]
     
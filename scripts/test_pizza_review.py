@@ -8,19 +8,24 @@ Uses async processing for faster execution
 
 import os
 import sys
-import json
+import textwrap
+import base64
+import functools
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from pathlib import Path
 import numpy as np
+from pydantic import Field, create_model
 import asyncio
-import concurrent.futures
 import time
 from PIL import Image, ImageOps
 import io
 
 # Configuration
 MAX_REVIEWS = 7  # Maximum number of pizza reviews to run
+IMAGES_PER_CHEF = max(1, int(os.getenv("PIZZATRON_IMAGES_PER_CHEF", "2")))  # Pizza images reviewed together in a single request per chef
+DISPLAY_MAX_SIZE = (1024, 1024)  # Images are only shown as figure thumbnails
+MAX_PARALLEL = int(os.getenv("PIZZATRON_MAX_PARALLEL", "8"))  # Concurrent OpenAI requests
 
 # Add parent directory to path to import from src
 sys.path.append(str(Path(__file__).parent.parent))
@@ -39,10 +44,13 @@ def find_test_images():
     """Find existing pizza images for testing"""
     pizza_images_dir = create_test_images_if_needed()
     
-    # Look for existing pizza images
-    image_files = []
-    for ext in ['*.jpg', '*.jpeg', '*.png']:
-        image_files.extend(pizza_images_dir.glob(ext))
+    # Look for existing pizza images in a single directory scan
+    image_extensions = {'.jpg', '.jpeg', '.png'}
+    image_files = [
+        Path(entry.path)
+        for entry in os.scandir(pizza_images_dir)
+        if entry.is_file() and Path(entry.name).suffix.lower() in image_extensions
+    ]
     
     # Convert to static paths (as expected by the function)
     static_paths = [f"/static/images/pizzas/{img.name}" for img in image_files]
@@ -58,7 +66,10 @@ def load_and_fix_image(image_path: str):
         
         # Open image and apply EXIF orientation correction
         image = Image.open(io.BytesIO(image_bytes))
+        # Let libjpeg decode at reduced scale - we only need a display-sized copy
+        image.draft("RGB", DISPLAY_MAX_SIZE)
         image = ImageOps.exif_transpose(image)
+        image.thumbnail(DISPLAY_MAX_SIZE, Image.Resampling.LANCZOS)
         
         # Convert to RGB if needed for consistent display
         if image.mode in ('RGBA', 'LA', 'P'):
@@ -79,24 +90,52 @@ def load_and_fix_image(image_path: str):
         print(f"Warning: Could not load image {local_path}: {e}")
         return None
 
-def mock_review_pizza_images(pizza_image_paths: list, chef_name: str) -> dict:
+def _get_category_names() -> tuple:
+    """Review category names, from the database manager's category cache"""
+    from src.db import db_manager
+    
+    return tuple(db_manager.get_category_names().values())
+
+@functools.lru_cache(maxsize=1)
+def _system_prompt_template() -> str:
+    """Read the pizza review system prompt template once per process"""
+    with open("src/prompts/pizza_review_system_prompt.txt", "r") as prompt_file:
+        return prompt_file.read()
+
+@functools.lru_cache(maxsize=None)
+def _build_review_model(category_names: tuple) -> type:
+    """Build the PizzaReview structured output model (1-5 scale per category)"""
+    # Category names aren't valid identifiers ("Crust Quality"), so expose them as aliases
+    scores_model = create_model(
+        "Scores",
+        **{
+            f"category_{i}": (int, Field(alias=cat, ge=1, le=5))
+            for i, cat in enumerate(category_names)
+        },
+    )
+    return create_model("PizzaReview", review_summary=(str, ...), scores=(scores_model, ...))
+
+def _encode_image(image_path: str):
+    """Read a /static image path and return it base64 encoded, or None on failure"""
+    local_path = os.path.join("src", image_path.lstrip("/"))
+    try:
+        with open(local_path, "rb") as f:
+            return base64.b64encode(f.read()).decode("utf-8")
+    except Exception as e:
+        print(f"Warning: could not read image {local_path}: {e}")
+        return None
+
+async def mock_review_pizza_images(encoded_images: list, chef_name: str) -> dict:
     """
     Modified version of review_pizza_images that reads categories from database
     Similar to the original function but can be used independently for testing
+    Takes images already base64 encoded (see _encode_image) so no file I/O
+    happens inside the parallel section
     """
-    from src.ai import client
-    import base64
-    
-    # Get review categories from database
-    from src.db import db_manager
+    from src.ai import aclient
     
-    session = db_manager.get_session()
-    try:
-        from src.db import ReviewCategory
-        categories = session.query(ReviewCategory).all()
-        category_names = [cat.name for cat in categories]
-    finally:
-        session.close()
+    # Get review categories (cached after the first lookup)
+    category_names = list(_get_category_names())
     
     # Fallback to hardcoded categories if database is empty
     if not category_names:
@@ -104,25 +143,19 @@ def mock_review_pizza_images(pizza_image_paths: list, chef_name: str) -> dict:
         print("Warning: No categories found in database, using fallback categories")
     
     # Load system prompt
-    with open("src/prompts/pizza_review_system_prompt.txt", "r") as prompt_file:
-        system_prompt = prompt_file.read().format(chef_name=chef_name)
+    system_prompt = _system_prompt_template().format(chef_name=chef_name)
 
     # Build multimodal input (text + images)
-    image_parts = []
-    for image_path in pizza_image_paths:
-        local_path = os.path.join("src", image_path.lstrip("/"))
-        try:
-            with open(local_path, "rb") as f:
-                b64 = base64.b64encode(f.read()).decode("utf-8")
-                # Responses API multimodal part
-                image_parts.append({
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{b64}"
-                    }
-                })
-        except Exception as e:
-            print(f"Warning: could not read image {local_path}: {e}")
+    image_parts = [
+        {
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:image/jpeg;base64,{b64}"
+            }
+        }
+        for b64 in encoded_images
+        if b64 is not None
+    ]
 
     # Guard against no images
     if not image_parts:
@@ -131,60 +164,64 @@ def mock_review_pizza_images(pizza_image_paths: list, chef_name: str) -> dict:
             "scores": {cat_name: 0 for cat_name in category_names},
         }
 
-    # Build a JSON Schema for structured output (1-5 scale)
-    score_props = {cat: {"type": "integer", "minimum": 1, "maximum": 5} for cat in category_names}
-    json_schema = {
-        "name": "PizzaReview",
-        "schema": {
-            "type": "object",
-            "properties": {
-                "review_summary": {"type": "string"},
-                "scores": {
-                    "type": "object",
-                    "properties": score_props,
-                    "required": list(score_props.keys()),
-                    "additionalProperties": False
-                }
-            },
-            "required": ["review_summary", "scores"],
-            "additionalProperties": False
-        }
-    }
+    # Structured output model (1-5 scale)
+    review_model = _build_review_model(tuple(category_names))
 
     user_prompt = (
         f"Here is the submission from chef {chef_name}. "
         f"Please review it and produce ONLY JSON matching the schema."
     )
 
-    # Use chat.completions.create with explicit json_schema response_format
-    response = client.chat.completions.create(
+    # Let the SDK build the schema from the model and parse the response into it
+    response = await aclient.beta.chat.completions.parse(
         model="gpt-5",
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": [{"type": "text", "text": user_prompt}] + image_parts},
         ],
-        response_format={"type": "json_schema", "json_schema": json_schema},
+        response_format=review_model,
     )
 
-    review = response.choices[0].message.content
-    return json.loads(review)
+    review = response.choices[0].message.parsed
+    return review.model_dump(by_alias=True)
 
-async def review_pizza_async(image_path: str, chef_alias: str) -> tuple:
-    """Async wrapper for pizza review function"""
-    loop = asyncio.get_event_loop()
-    
-    def run_review():
-        try:
-            result = mock_review_pizza_images([image_path], f"Chef {chef_alias}")
-            return result, None
-        except Exception as e:
-            return None, str(e)
-    
-    # Run the blocking function in a thread pool
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        result, error = await loop.run_in_executor(executor, run_review)
-    
-    return chef_alias, image_path, result, error
+async def review_pizza_async(image_paths: list, encoded_images: list, chef_alias: str, semaphore: asyncio.Semaphore) -> tuple:
+    """Run a single review of all of a chef's pizza images, capturing any error alongside the result"""
+    try:
+        async with semaphore:
+            result = await mock_review_pizza_images(encoded_images, f"Chef {chef_alias}")
+        error = None
+    except Exception as e:
+        result, error = None, str(e)
+    
+    return chef_alias, image_paths, result, error
+
+# Figure skeletons keyed by row count, reused across runs
+_FIGURES = {}
+
+def _build_figure(num_rows: int):
+    """Create the figure, per-row axes and colorbar axes for num_rows pizza reviews"""
+    # Set up the figure - larger to accommodate images
+    fig = plt.figure(figsize=(20, 4 * num_rows))
+    
+    # Create a grid layout: images on left, heatmap in middle, reviews on right
+    gs = fig.add_gridspec(num_rows, 4, width_ratios=[1, 2, 2, 1.5], hspace=0.3, wspace=0.3)
+    axes = np.array([[fig.add_subplot(gs[i, j]) for j in range(4)] for i in range(num_rows)])
+    
+    # Small colorbar at the bottom
+    cbar_ax = fig.add_axes([0.35, 0.02, 0.3, 0.02])
+    
+    return fig, axes, cbar_ax
+
+def _get_figure(num_rows: int):
+    """Return a cleared figure skeleton for num_rows, building it on first use"""
+    if num_rows not in _FIGURES:
+        _FIGURES[num_rows] = _build_figure(num_rows)
+    fig, axes, cbar_ax = _FIGURES[num_rows]
+    for ax in axes.flatten():
+        ax.clear()
+    cbar_ax.clear()
+    return fig, axes, cbar_ax
 
 def create_visualization(results, image_data):
     """Create a matplotlib visualization showing pizza images, scores and reviews"""
@@ -194,21 +231,18 @@ def create_visualization(results, image_data):
     
     num_pizzas = len(results)
     
-    # Set up the figure - larger to accommodate images
-    fig = plt.figure(figsize=(20, 4 * num_pizzas))
-    
-    # Create a grid layout: images on left, heatmap in middle, reviews on right
-    gs = fig.add_gridspec(num_pizzas, 4, width_ratios=[1, 2, 2, 1.5], hspace=0.3, wspace=0.3)
+    fig, axes, cbar_ax = _get_figure(num_pizzas)
     
     # Extract data for plotting
     chef_names = list(results.keys())
     categories = list(results[chef_names[0]]['scores'].keys())
     
-    # Create scores matrix
-    scores_matrix = []
-    for chef in chef_names:
-        scores_matrix.append([results[chef]['scores'][cat] for cat in categories])
-    scores_matrix = np.array(scores_matrix)
+    # Create scores matrix (scores are 1-5, so int8 is plenty)
+    scores_matrix = np.fromiter(
+        (results[chef]['scores'][cat] for chef in chef_names for cat in categories),
+        dtype=np.int8,
+    ).reshape(len(chef_names), len(categories))
+    avg_scores = scores_matrix.mean(axis=1)
     
     # Main title
     fig.suptitle('PIZZATRON Pizza Review Results', fontsize=20, fontweight='bold', y=0.95)
@@ -216,7 +250,7 @@ def create_visualization(results, image_data):
     # For each pizza, create a row with: image | scores heatmap | review text | avg score
     for i, chef_name in enumerate(chef_names):
         # Column 1: Pizza Image
-        ax_img = fig.add_subplot(gs[i, 0])
+        ax_img = axes[i, 0]
         if chef_name in image_data and image_data[chef_name] is not None:
             ax_img.imshow(image_data[chef_name])
             ax_img.set_title(f'{chef_name}\nPizza Image', fontweight='bold', fontsize=12)
@@ -227,7 +261,7 @@ def create_visualization(results, image_data):
         ax_img.axis('off')
         
         # Column 2: Individual scores heatmap for this pizza
-        ax_scores = fig.add_subplot(gs[i, 1])
+        ax_scores = axes[i, 1]
         pizza_scores = scores_matrix[i:i+1]  # Single row
         im = ax_scores.imshow(pizza_scores, cmap='RdYlGn', aspect='auto', vmin=1, vmax=5)
         
@@ -245,24 +279,13 @@ def create_visualization(results, image_data):
         ax_scores.set_title('Category Scores', fontweight='bold', fontsize=12)
         
         # Column 3: Review text
-        ax_review = fig.add_subplot(gs[i, 2])
+        ax_review = axes[i, 2]
         ax_review.axis('off')
         ax_review.set_title('PIZZATRON Review', fontweight='bold', fontsize=12)
         
         # Add review text with better formatting
         review_text = results[chef_name]['review_summary']
-        # Simple text wrapping
-        words = review_text.split()
-        lines = []
-        current_line = []
-        for word in words:
-            if len(' '.join(current_line + [word])) > 60:
-                lines.append(' '.join(current_line))
-                current_line = [word]
-            else:
-                current_line.append(word)
-        if current_line:
-            lines.append(' '.join(current_line))
+        lines = textwrap.wrap(review_text, width=60)
         
         # Display wrapped text
         y_start = 0.9
@@ -272,8 +295,8 @@ def create_visualization(results, image_data):
                           bbox=dict(boxstyle='round,pad=0.3', facecolor='lightgray', alpha=0.3))
         
         # Column 4: Average score with big number
-        ax_avg = fig.add_subplot(gs[i, 3])
-        avg_score = np.mean(scores_matrix[i])
+        ax_avg = axes[i, 3]
+        avg_score = avg_scores[i]
         
         # Color based on score
         color = 'red' if avg_score < 2.5 else 'orange' if avg_score < 3.5 else 'green'
@@ -289,8 +312,7 @@ def create_visualization(results, image_data):
         ax_avg.axis('off')
     
     # Add a small colorbar at the bottom
-    cbar_ax = fig.add_axes([0.35, 0.02, 0.3, 0.02])
-    cbar = plt.colorbar(im, cax=cbar_ax, orientation='horizontal')
+    cbar = fig.colorbar(im, cax=cbar_ax, orientation='horizontal')
     cbar.set_label('Score Scale (1=Poor, 5=Excellent)', fontsize=12)
     
     # Save the visualization
@@ -299,7 +321,7 @@ def create_visualization(results, image_data):
     project_root = Path(__file__).parent.parent
     output_path = project_root / output_filename
     
-    plt.savefig(output_path, dpi=150, bbox_inches='tight', facecolor='white')
+    fig.savefig(output_path, dpi=150, bbox_inches='tight', facecolor='white')
     print(f"📊 Visualization saved to: {output_filename}")
     
     plt.show()
@@ -323,13 +345,22 @@ async def test_pizza_review_async():
     # Create fake chef aliases - extend list to support more reviews
     chef_aliases = ["Alpha", "Beta", "Gamma", "Delta", "Epsilon", "Zeta", "Eta", "Theta", "Iota", "Kappa"]
     
-    print(f"\n🚀 Starting parallel pizza reviews for {len(pizza_image_paths)} chefs...")
+    # Group images by chef so each chef gets one review request covering all their pizzas
+    paths_by_chef = {}
+    for i, path in enumerate(pizza_image_paths):
+        paths_by_chef.setdefault(chef_aliases[i // IMAGES_PER_CHEF], []).append(path)
+    
+    print(f"\n🚀 Starting parallel pizza reviews for {len(paths_by_chef)} chefs...")
     start_time = time.time()
     
-    # Create tasks for all pizza reviews
+    # Read and encode every image up front, outside the parallel section
+    encoded_images = {path: _encode_image(path) for path in pizza_image_paths}
+    
+    # Create one review task per chef, with at most MAX_PARALLEL requests in flight
+    semaphore = asyncio.Semaphore(MAX_PARALLEL)
     tasks = [
-        review_pizza_async(pizza_image_paths[i], chef_aliases[i])
-        for i in range(len(pizza_image_paths))
+        review_pizza_async(paths, [encoded_images[path] for path in paths], chef_alias, semaphore)
+        for chef_alias, paths in paths_by_chef.items()
     ]
     
     # Process all reviews concurrently
@@ -348,7 +379,7 @@ async def test_pizza_review_async():
         if isinstance(result, Exception):
             print(f"  ✗ Exception occurred: {result}")
         else:
-            chef_alias, image_path, review_result, error = result
+            chef_alias, image_paths, review_result, error = result
             if error:
                 print(f"  ✗ Chef {chef_alias}: {error}")
             else:
@@ -356,8 +387,8 @@ async def test_pizza_review_async():
                 print(f"    Summary: {review_result['review_summary'][:50]}...")
                 chef_name = f"Chef {chef_alias}"
                 results[chef_name] = review_result
-                # Load the corresponding image
-                image_data[chef_name] = load_and_fix_image(image_path)
+                # Load the chef's first image for display
+                image_data[chef_name] = load_and_fix_image(image_paths[0])
     
     if results:
         avg_time_per_review = total_time / len(results)
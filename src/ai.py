@@ -1,133 +1,236 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
+import httpx
+import asyncio
 import base64
 from dotenv import load_dotenv
-import json
+import functools
+import hashlib
+import fastjsonschema
+import mimetypes
+import mmap
+import orjson
 import os
+from pathlib import Path
 import time
-from typing import List
+from typing import List, Optional
 from PIL import Image, ImageOps
 import io
 
+try:
+    import pybase64
+except ImportError:  # optional SIMD base64 codec, fall back to the stdlib
+    pybase64 = None
+
 load_dotenv()
 
-client = OpenAI()
+# The SDK retries rate limits, timeouts and 5xx errors with jittered exponential backoff
+aclient = AsyncOpenAI(max_retries=3, timeout=httpx.Timeout(120.0, connect=10.0))
 
-def generate_chef_image(reference_image_bytes: bytes):
-    import time
-    
+# Largest reference image sent to the image model (it generates at 1024x1024)
+REFERENCE_IMAGE_MAX_SIZE = (1024, 1024)
+EXIF_ORIENTATION_TAG = 274
+# Generated chef images keyed by a hash of the reference image and prompt
+CHEF_IMAGE_CACHE_DIR = Path("src/static/images/chefs/_cache")
+
+# Caps in-flight review requests; reviews beyond this queue on the event loop
+MAX_CONCURRENT_REVIEWS = 10
+_review_sem = asyncio.Semaphore(MAX_CONCURRENT_REVIEWS)
+
+# Rough prompt cost of one image part (high detail, several tiles)
+IMAGE_TOKEN_ESTIMATE = 1105
+
+
+class RateLimiter:
+    """
+    Token-bucket throttle for an API's requests-per-minute and tokens-per-minute quotas.
+
+    acquire() waits until both buckets have room, so calls are paced under the
+    quota instead of tripping 429s and burning time in retry backoff.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._available_requests = requests_per_minute
+        self._available_tokens = tokens_per_minute
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed_minutes = (now - self._last_refill) / 60
+        self._last_refill = now
+        self._available_requests = min(
+            self.requests_per_minute,
+            self._available_requests + elapsed_minutes * self.requests_per_minute,
+        )
+        self._available_tokens = min(
+            self.tokens_per_minute,
+            self._available_tokens + elapsed_minutes * self.tokens_per_minute,
+        )
+
+    async def acquire(self, tokens: float):
+        """Wait until one request and `tokens` tokens are available, then consume them"""
+        # A single call larger than the whole bucket would otherwise never fit
+        tokens = min(tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._available_requests >= 1 and self._available_tokens >= tokens:
+                    self._available_requests -= 1
+                    self._available_tokens -= tokens
+                    return
+                wait_minutes = max(
+                    (1 - self._available_requests) / self.requests_per_minute,
+                    (tokens - self._available_tokens) / self.tokens_per_minute,
+                )
+                await asyncio.sleep(wait_minutes * 60)
+
+
+# Paced at 90% of the account's advertised review model limits
+_review_rate_limiter = RateLimiter(
+    requests_per_minute=0.9 * float(os.getenv("OPENAI_REVIEW_RPM_LIMIT", "500")),
+    tokens_per_minute=0.9 * float(os.getenv("OPENAI_REVIEW_TPM_LIMIT", "500000")),
+)
+
+
+def _b64encode(data: bytes) -> str:
+    """Base64 encode bytes to a str, using pybase64 when available"""
+    if pybase64 is not None:
+        return pybase64.b64encode_as_string(data)
+    return base64.b64encode(data).decode("utf-8")
+
+
+def _b64decode(data: str) -> bytes:
+    """Base64 decode a str to bytes, using pybase64 when available"""
+    if pybase64 is not None:
+        return pybase64.b64decode(data, validate=False)
+    return base64.b64decode(data)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_prompt(filename: str) -> str:
+    """Read a prompt file from src/prompts once and keep it for the process lifetime"""
+    with open(os.path.join("src", "prompts", filename), "r") as prompt_file:
+        return prompt_file.read()
+
+
+def _prepare_reference_image(reference_image_bytes: bytes) -> bytes:
+    """Fix orientation and flatten transparency of a chef reference image"""
     # Process input image to ensure correct orientation
     try:
         # Open the image and fix orientation using EXIF data
         input_image = Image.open(io.BytesIO(reference_image_bytes))
         
+        # Fast path: an upright, small enough RGB JPEG needs no changes, so
+        # forward the original bytes without decoding or re-encoding
+        if (
+            input_image.format == 'JPEG'
+            and input_image.mode == 'RGB'
+            and input_image.getexif().get(EXIF_ORIENTATION_TAG, 1) == 1
+            and input_image.width <= REFERENCE_IMAGE_MAX_SIZE[0]
+            and input_image.height <= REFERENCE_IMAGE_MAX_SIZE[1]
+        ):
+            return reference_image_bytes
+        
         # Apply EXIF orientation correction
         input_image = ImageOps.exif_transpose(input_image)
         
+        # The model works at 1024x1024, so don't upload more pixels than that
+        input_image.thumbnail(REFERENCE_IMAGE_MAX_SIZE, Image.Resampling.LANCZOS)
+        
         # Convert to RGB if needed (remove alpha channel)
         if input_image.mode in ('RGBA', 'LA', 'P'):
-            # Create white background
-            background = Image.new('RGB', input_image.size, (255, 255, 255))
-            if input_image.mode == 'P':
+            # Composite onto a white background in a single blend
+            if input_image.mode != 'RGBA':
                 input_image = input_image.convert('RGBA')
-            background.paste(input_image, mask=input_image.split()[-1] if input_image.mode in ('RGBA', 'LA') else None)
-            input_image = background
+            background = Image.new('RGBA', input_image.size, (255, 255, 255, 255))
+            input_image = Image.alpha_composite(background, input_image).convert('RGB')
         elif input_image.mode != 'RGB':
             input_image = input_image.convert('RGB')
         
-        # Save the processed image back to bytes
+        # Save the processed image back to bytes - everything is RGB by now, and
+        # JPEG is far smaller than PNG for photos
         processed_image_bytes = io.BytesIO()
-        input_image.save(processed_image_bytes, format='PNG')
+        input_image.save(processed_image_bytes, format='JPEG', quality=90)
         processed_image_bytes = processed_image_bytes.getvalue()
         
     except Exception as e:
         print(f"Warning: Could not process input image orientation: {e}")
         # Fall back to original bytes if processing fails
         processed_image_bytes = reference_image_bytes
-    
-    with open("src/prompts/chef_image.txt", "r") as prompt_file:
-        prompt = prompt_file.read()
 
-    max_retries = 3
-    retry_delay = 2  # seconds
-    
-    for attempt in range(max_retries):
-        try:
-            result = client.images.edit(
-                model="gpt-image-1",
-                image=processed_image_bytes,
-                prompt=prompt,
-                size="1024x1024",
-            )
-
-            image_base64 = result.data[0].b64_json
-            image_bytes = base64.b64decode(image_base64)
-
-            return image_bytes
-            
-        except Exception as e:
-            print(f"AI generation attempt {attempt + 1} failed: {e}")
-            
-            if attempt == max_retries - 1:
-                # Last attempt failed, re-raise the exception
-                raise e
-            
-            # Wait before retrying
-            print(f"Retrying in {retry_delay} seconds...")
-            time.sleep(retry_delay)
-            retry_delay *= 2  # Exponential backoff
-
-
-def review_pizza_images(pizza_image_paths: list, chef_name: str) -> dict:
-    """
-    Review pizza images using GPT-5 via the Responses API.
+    return processed_image_bytes
 
-    Args:
-        pizza_image_paths: List of /static image paths (e.g. "/static/images/pizzas/foo.jpg")
-        chef_name: Name of the chef who made the pizza
 
-    Returns:
-        dict with keys:
-          - review_summary: str
-          - scores: dict of category -> int (1-5)
-    """
-    # Get review categories from database
-    from .db import db_manager
+async def generate_chef_image(reference_image_bytes: bytes):
+    # Image decode/encode is CPU bound, keep it off the event loop
+    processed_image_bytes = await asyncio.to_thread(_prepare_reference_image, reference_image_bytes)
     
-    session = db_manager.get_session()
+    prompt = _load_prompt("chef_image.txt")
+
+    # Identical reference image + prompt -> reuse the earlier generation
+    cache_key = hashlib.blake2b(processed_image_bytes + prompt.encode("utf-8"), digest_size=16).hexdigest()
+    cache_path = CHEF_IMAGE_CACHE_DIR / f"{cache_key}.png"
+    if cache_path.exists():
+        return await asyncio.to_thread(cache_path.read_bytes)
+
+    # Retries (with backoff) and timeouts are handled by the client
+    result = await aclient.images.edit(
+        model="gpt-image-1",
+        image=processed_image_bytes,
+        prompt=prompt,
+        size="1024x1024",
+    )
+
+    image_base64 = result.data[0].b64_json
+    image_bytes = _b64decode(image_base64)
+
     try:
-        from .db import ReviewCategory
-        categories = session.query(ReviewCategory).all()
-        category_names = [cat.name for cat in categories]
-    finally:
-        session.close()
-    
-    # load system prompt
-    with open("src/prompts/pizza_review_system_prompt.txt", "r") as prompt_file:
-        system_prompt = prompt_file.read().format(chef_name=chef_name)
+        CHEF_IMAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        await asyncio.to_thread(cache_path.write_bytes, image_bytes)
+    except OSError as e:
+        print(f"Warning: could not cache generated chef image: {e}")
 
-    # --- build multimodal input (text + images) ---
-    image_parts = []
-    for image_path in pizza_image_paths:
-        local_path = os.path.join("src", image_path.lstrip("/"))
-        try:
-            with open(local_path, "rb") as f:
-                b64 = base64.b64encode(f.read()).decode("utf-8")
-                # Responses API multimodal part
-                image_parts.append({
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{b64}"
-                    }
-                })
-        except Exception as e:
-            print(f"Warning: could not read image {local_path}: {e}")
+    return image_bytes
 
-    # Guard against no images
-    if not image_parts:
-        return {
-            "review_summary": "No images supplied for review.",
-            "scores": {cat_name: 0 for cat_name in category_names},
+
+def _is_public_url(image_path: str) -> bool:
+    return image_path.startswith(("http://", "https://"))
+
+
+def _encode_image_part(image_path: str) -> Optional[dict]:
+    """Read a /static image path into a multimodal image part, or None if unreadable"""
+    local_path = os.path.join("src", image_path.lstrip("/"))
+    try:
+        # Encode straight from a read-only mapping to avoid an extra copy of the file
+        with open(local_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            b64 = _b64encode(mm)
+    except Exception as e:
+        print(f"Warning: could not read image {local_path}: {e}")
+        return None
+
+    mime_type = mimetypes.guess_type(local_path)[0] or "image/jpeg"
+    # Responses API multimodal part
+    return {
+        "type": "image_url",
+        "image_url": {
+            "url": "".join(("data:", mime_type, ";base64,", b64))
         }
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _get_categories_and_schema(categories_version: int) -> tuple:
+    """
+    Load review category names, build the structured output schema and compile its validator.
+
+    Cached per categories_version, which DatabaseManager bumps whenever it
+    writes review categories, so the schema is only rebuilt after a change.
+    """
+    from .db import db_manager
+
+    category_names = tuple(db_manager.get_category_names().values())
 
     # Build a JSON Schema for structured output (1-5 scale)
     score_props = {cat: {"type": "integer", "minimum": 1, "maximum": 5} for cat in category_names}
@@ -149,6 +252,55 @@ def review_pizza_images(pizza_image_paths: list, chef_name: str) -> dict:
         }
     }
 
+    # Compiled once per schema; far cheaper to run than an interpreted validator
+    validate_review = fastjsonschema.compile(json_schema["schema"])
+
+    return category_names, json_schema, validate_review
+
+
+async def review_pizza_images(pizza_image_paths: list, chef_name: str) -> dict:
+    """
+    Review pizza images using GPT-5 via the Responses API.
+
+    Args:
+        pizza_image_paths: List of /static image paths (e.g. "/static/images/pizzas/foo.jpg")
+            or public http(s) URLs, which are passed to the model as-is
+        chef_name: Name of the chef who made the pizza
+
+    Returns:
+        dict with keys:
+          - review_summary: str
+          - scores: dict of category -> int (1-5)
+    """
+    # Get review categories and output schema (cached until categories change)
+    from .db import db_manager
+    category_names, json_schema, validate_review = _get_categories_and_schema(db_manager.categories_version)
+    
+    # load system prompt
+    system_prompt = _load_prompt("pizza_review_system_prompt.txt").format(chef_name=chef_name)
+
+    # --- build multimodal input (text + images) ---
+    # Public URLs are fetched by OpenAI directly; local files are read and
+    # encoded in parallel worker threads, off the event loop. gather keeps
+    # the parts in the same order as pizza_image_paths.
+    async def _image_part(image_path: str):
+        if _is_public_url(image_path):
+            return {"type": "image_url", "image_url": {"url": image_path}}
+        return await asyncio.to_thread(_encode_image_part, image_path)
+
+    image_parts = [
+        part
+        for part in await asyncio.gather(*(_image_part(image_path) for image_path in pizza_image_paths))
+        if part is not None
+    ]
+
+    # Guard against no images
+    if not image_parts:
+        return {
+            "review_summary": "No images supplied for review.",
+            "scores": {cat_name: 0 for cat_name in category_names},
+        }
+
     # (remove the Pydantic ResponseFormat class)
 
     user_prompt = (
@@ -157,22 +309,29 @@ def review_pizza_images(pizza_image_paths: list, chef_name: str) -> dict:
     )
 
     # Use chat.completions.create with explicit json_schema response_format
-    response = client.chat.completions.create(
-        model="gpt-5",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": [{"type": "text", "text": user_prompt}] + image_parts},
-        ],
-        response_format={"type": "json_schema", "json_schema": json_schema},    )
+    # Estimate prompt tokens (~4 characters per text token) for the TPM bucket
+    estimated_tokens = (len(system_prompt) + len(user_prompt)) / 4 + IMAGE_TOKEN_ESTIMATE * len(image_parts)
+
+    async with _review_sem:
+        await _review_rate_limiter.acquire(estimated_tokens)
+        response = await aclient.chat.completions.create(
+            model="gpt-5",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": [{"type": "text", "text": user_prompt}] + image_parts},
+            ],
+            response_format={"type": "json_schema", "json_schema": json_schema},
+        )
 
     review = response.choices[0].message.content
 
-    return json.loads(review)
+    # Raises fastjsonschema.JsonSchemaException rather than saving malformed scores
+    return validate_review(orjson.loads(review))
 
 
 if __name__ == "__main__":
-    review = review_pizza_images(
+    review = asyncio.run(review_pizza_images(
         ["static/images/pizzas/pizza_6_2_59a16b4a.jpeg"],
         "Chef 1",
-    )
+    ))
     print(review)
\ No newline at end of file
@@ -5,17 +5,18 @@ Pizzatron FastAPI Web Application
 A simple web interface for viewing and managing pizzas and chefs.
 """
 
-from fastapi import FastAPI, Request, Depends, Form, UploadFile, File, BackgroundTasks
+from fastapi import FastAPI, Request, Depends, Form, UploadFile, File
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, ORJSONResponse
 from typing import List, Optional
 import os
+import shutil
 import uuid
 from pathlib import Path
 import asyncio
 
-from .db import db_manager, init_db, Chef, Pizza, PizzaImage, ReviewCategory, PizzaReview, PizzaReviewScore
+from .db import db_manager, init_db, Chef, Pizza, PizzaImage, PizzaReview, PizzaReviewScore
 from .ai import generate_chef_image, review_pizza_images
 
 # Initialize the database
@@ -25,7 +26,8 @@ init_db()
 app = FastAPI(
     title="Pizzatron AI Judge",
     description="Retro AI system for analyzing pizza excellence at pizza making nights",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Set up templates and static files
@@ -38,14 +40,48 @@ os.makedirs("src/static", exist_ok=True)
 # Mount static files
 app.mount("/static", StaticFiles(directory="src/static"), name="static")
 
+# Public base URL of this server (e.g. https://pizzatron.example/), set when it is reachable
+# from the internet so the AI can fetch /static images by URL. Configured rather than taken
+# from the request, whose Host header is client controlled.
+PUBLIC_BASE_URL = os.getenv("PIZZATRON_PUBLIC_BASE_URL", "").strip()
+if PUBLIC_BASE_URL and not PUBLIC_BASE_URL.endswith("/"):
+    PUBLIC_BASE_URL += "/"
 
-def process_chef_image_background(chef_id: int, image_content: bytes, original_filename: str):
+# Strong references to in-flight background jobs so they aren't garbage collected mid-run
+_background_jobs = set()
+
+
+def _copy_to_disk(source, file_path: Path) -> int:
+    """Copy a file object to disk in 1 MiB chunks, returning the number of bytes written"""
+    with open(file_path, "wb") as f:
+        shutil.copyfileobj(source, f, length=1 << 20)
+        return f.tell()
+
+
+async def save_upload(upload: UploadFile, file_path: Path) -> int:
+    """Stream an uploaded file to disk in a worker thread, returning its size in bytes"""
+    await upload.seek(0)
+    return await asyncio.to_thread(_copy_to_disk, upload.file, file_path)
+
+
+def schedule_background(coro):
+    """Run a coroutine on the event loop without waiting for it"""
+    task = asyncio.create_task(coro)
+    _background_jobs.add(task)
+    task.add_done_callback(_background_jobs.discard)
+    return task
+
+
+async def process_chef_image_background(chef_id: int, reference_image_path: Path, original_filename: str):
     """Background task to generate AI chef image and update database"""
     try:
         print(f"Starting AI image generation for chef {chef_id}...")
         
+        # Read back the uploaded reference image saved by the request handler
+        image_content = await asyncio.to_thread(reference_image_path.read_bytes)
+        
         # Generate the chef image with AI
-        chef_image_bytes = generate_chef_image(image_content)
+        chef_image_bytes = await generate_chef_image(image_content)
         
         # Create unique filename for generated image
         unique_filename = f"chef_ai_{uuid.uuid4().hex[:8]}.png"
@@ -54,10 +90,9 @@ def process_chef_image_background(chef_id: int, image_content: bytes, original_f
         chef_images_dir = Path("src/static/images/chefs")
         chef_images_dir.mkdir(parents=True, exist_ok=True)
         
-        # Save the generated image
+        # Save the generated image (in a worker thread, off the event loop)
         file_path = chef_images_dir / unique_filename
-        with open(file_path, "wb") as f:
-            f.write(chef_image_bytes)
+        await asyncio.to_thread(file_path.write_bytes, chef_image_bytes)
         
         # Update the chef's image path in database
         ai_image_path = f"/static/images/chefs/{unique_filename}"
@@ -114,24 +149,24 @@ async def home(request: Request):
 @app.get("/api/pizzas")
 async def get_pizzas():
     """API endpoint to get all pizzas"""
-    pizzas = db_manager.get_all_pizzas()
-    return [
-        {
-            "id": pizza.id,
-            "chef_id": pizza.chef_id,
-            "chef_name": pizza.chef.name if pizza.chef else "Unknown",
-            "created_at": pizza.created_at.isoformat(),
-            "images": [
-                {
-                    "id": img.id,
-                    "image_path": img.image_path,
-                    "created_at": img.created_at.isoformat()
-                }
-                for img in pizza.images
-            ]
-        }
-        for pizza in pizzas
-    ]
+    # Plain rows (one per image) are enough for JSON, so skip building ORM objects
+    pizzas = []
+    for row in db_manager.get_all_pizzas_rows():
+        if not pizzas or pizzas[-1]["id"] != row.id:
+            pizzas.append({
+                "id": row.id,
+                "chef_id": row.chef_id,
+                "chef_name": row.chef_name or "Unknown",
+                "created_at": row.created_at,
+                "images": []
+            })
+        if row.image_id is not None:
+            pizzas[-1]["images"].append({
+                "id": row.image_id,
+                "image_path": row.image_path,
+                "created_at": row.image_created_at
+            })
+    return pizzas
 
 
 @app.get("/api/chefs")
@@ -143,7 +178,7 @@ async def get_chefs():
             "id": chef.id,
             "name": chef.name,
             "image_path": chef.image_path,
-            "created_at": chef.created_at.isoformat(),
+            "created_at": chef.created_at,
             "pizza_count": len(chef.pizzas)
         }
         for chef in chefs
@@ -199,7 +234,6 @@ async def create_chef_form(request: Request):
 @app.post("/create-chef")
 async def create_chef_submit(
     request: Request, 
-    background_tasks: BackgroundTasks,
     name: str = Form(...), 
     image: Optional[UploadFile] = File(None)
 ):
@@ -219,8 +253,8 @@ async def create_chef_submit(
         
         # Handle image upload with background processing
         temp_image_path = None
+        temp_file_path = None
         should_process_ai = False
-        image_content = None
         
         if image and image.filename:
             # Validate file type
@@ -238,20 +272,16 @@ async def create_chef_submit(
                     }
                 )
             
-            # Read the uploaded image bytes
-            image_content = await image.read()
-            
-            # Save temporary original image immediately
+            # Save temporary original image immediately, streamed rather than buffered
             temp_filename = f"chef_temp_{uuid.uuid4().hex[:8]}{file_extension}"
             chef_images_dir = Path("src/static/images/chefs")
             chef_images_dir.mkdir(parents=True, exist_ok=True)
             
             temp_file_path = chef_images_dir / temp_filename
-            with open(temp_file_path, "wb") as f:
-                f.write(image_content)
+            image_size = await save_upload(image, temp_file_path)
             
             temp_image_path = f"/static/images/chefs/{temp_filename}"
-            should_process_ai = True
+            should_process_ai = image_size > 0
         
         # Create the chef immediately with temporary image
         chef = db_manager.create_chef(
@@ -260,13 +290,12 @@ async def create_chef_submit(
         )
         
         # Start background AI processing if needed
-        if should_process_ai and image_content:
-            background_tasks.add_task(
-                process_chef_image_background, 
+        if should_process_ai:
+            schedule_background(process_chef_image_background(
                 chef.id, 
-                image_content, 
+                temp_file_path, 
                 image.filename
-            )
+            ))
         
         # Redirect immediately to the new chef's page
         return RedirectResponse(url=f"/chef/{chef.id}", status_code=303)
@@ -300,7 +329,6 @@ async def submit_pizza_form(request: Request):
 @app.post("/submit-pizza")
 async def submit_pizza_handler(
     request: Request,
-    background_tasks: BackgroundTasks,
     chef_id: int = Form(...),
     images: List[UploadFile] = File(...)
 ):
@@ -360,30 +388,35 @@ async def submit_pizza_handler(
         pizza_images_dir = Path("src/static/images/pizzas")
         pizza_images_dir.mkdir(parents=True, exist_ok=True)
         
+        uploads = []
         for i, image in enumerate(images):
             if image.filename:
                 file_extension = Path(image.filename).suffix.lower()
                 unique_filename = f"pizza_{pizza.id}_{i+1}_{uuid.uuid4().hex[:8]}{file_extension}"
-                
-                image_content = await image.read()
-                file_path = pizza_images_dir / unique_filename
-                
-                with open(file_path, "wb") as f:
-                    f.write(image_content)
-                
-                web_path = f"/static/images/pizzas/{unique_filename}"
-                pizza_image_paths.append(web_path)
-                
-                # Add to database
-                db_manager.add_pizza_image(pizza.id, web_path)
+                uploads.append((image, pizza_images_dir / unique_filename))
+        
+        # Write all images to disk in parallel
+        await asyncio.gather(*(save_upload(image, file_path) for image, file_path in uploads))
+        
+        for image, file_path in uploads:
+            web_path = f"/static/images/pizzas/{file_path.name}"
+            pizza_image_paths.append(web_path)
+            
+            # Add to database
+            db_manager.add_pizza_image(pizza.id, web_path)
+        
+        # Let OpenAI fetch the images itself when this server is publicly reachable,
+        # instead of uploading them base64 encoded
+        review_image_paths = pizza_image_paths
+        if PUBLIC_BASE_URL:
+            review_image_paths = [PUBLIC_BASE_URL + path.lstrip("/") for path in pizza_image_paths]
         
         # Start background AI review
-        background_tasks.add_task(
-            process_pizza_review_background,
+        schedule_background(process_pizza_review_background(
             pizza.id,
-            pizza_image_paths,
+            review_image_paths,
             chef.name
-        )
+        ))
         
         # Redirect to pizza detail/results page
         return RedirectResponse(url=f"/pizza/{pizza.id}", status_code=303)
@@ -401,13 +434,13 @@ async def submit_pizza_handler(
         )
 
 
-def process_pizza_review_background(pizza_id: int, image_paths: list, chef_name: str):
+async def process_pizza_review_background(pizza_id: int, image_paths: list, chef_name: str):
     """Background task to review pizza and save results"""
     try:
         print(f"Starting pizza review for pizza {pizza_id}...")
         
         # Get AI review
-        review_data = review_pizza_images(image_paths, chef_name)
+        review_data = await review_pizza_images(image_paths, chef_name)
         
         # Save review to database
         session = db_manager.get_session()
@@ -418,12 +451,11 @@ def process_pizza_review_background(pizza_id: int, image_paths: list, chef_name:
                 review_summary=review_data["review_summary"]
             )
             session.add(pizza_review)
-            session.commit()
-            session.refresh(pizza_review)
+            # Flush populates pizza_review.id; the scores share this transaction
+            session.flush()
             
-            # Get all categories
-            categories = session.query(ReviewCategory).all()
-            category_map = {cat.name: cat.id for cat in categories}
+            # Category name -> id, from the database manager's cache
+            category_map = {name: category_id for category_id, name in db_manager.get_category_names().items()}
             
             # Save scores
             for category_name, score in review_data["scores"].items():
@@ -468,6 +500,7 @@ async def pizza_detail(request: Request, pizza_id: int):
             {
                 "request": request,
                 "pizza": pizza,
+                "category_names": db_manager.get_category_names(),
                 "title": f"Pizza {pizza_id} Analysis"
             }
         )
@@ -489,30 +522,30 @@ async def leaderboard(request: Request):
         # Get pizzas with reviews, ordered by average score
         session = db_manager.get_session()
         try:
-            from sqlalchemy import func, distinct
+            from sqlalchemy import func
+            from sqlalchemy.orm import contains_eager, joinedload, selectinload
             
-            # Get pizza IDs with their average scores (simple aggregation)
-            pizza_scores = (
+            # Top pizzas with their average scores, eager loading everything the template shows
+            pizzas_with_scores = (
                 session.query(
-                    Pizza.id,
+                    Pizza,
                     func.avg(PizzaReviewScore.score).label('avg_score')
                 )
-                .select_from(Pizza)
                 .join(PizzaReview, Pizza.id == PizzaReview.pizza_id)
                 .join(PizzaReviewScore, PizzaReview.id == PizzaReviewScore.pizza_review_id)
+                .options(
+                    joinedload(Pizza.chef),
+                    # Fill Pizza.review from the explicit join rather than joining it again
+                    contains_eager(Pizza.review),
+                    # selectin for the collection so rows aren't duplicated per image
+                    selectinload(Pizza.images)
+                )
                 .group_by(Pizza.id)
                 .order_by(func.avg(PizzaReviewScore.score).desc())
                 .limit(10)
                 .all()
             )
             
-            # Convert to a list of tuples with pizza objects and scores
-            pizzas_with_scores = []
-            for pizza_id, avg_score in pizza_scores:
-                pizza = session.query(Pizza).filter(Pizza.id == pizza_id).first()
-                if pizza:
-                    pizzas_with_scores.append((pizza, avg_score))
-            
             return templates.TemplateResponse(
                 "leaderboard.html",
                 {
@@ -1,9 +1,11 @@
 import os
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship, Session, joinedload
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import create_engine, event, func, select, bindparam, lambda_stmt, Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.engine import Row
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import declarative_base, Mapped, sessionmaker, relationship, Session, joinedload, selectinload
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,92 +16,129 @@ Base = declarative_base()
 class Chef(Base):
     __tablename__ = 'chefs'
     
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String(255), nullable=False)
-    image_path = Column(String(500), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    id: Mapped[int] = Column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = Column(String(255), nullable=False)
+    image_path: Mapped[Optional[str]] = Column(String(500), nullable=True)
+    created_at: Mapped[Optional[datetime]] = Column(DateTime, default=datetime.utcnow, server_default=func.current_timestamp())
     
     # Relationship to pizzas
-    pizzas = relationship("Pizza", back_populates="chef", cascade="all, delete-orphan")
+    pizzas: Mapped[List["Pizza"]] = relationship("Pizza", back_populates="chef", cascade="all, delete-orphan")
     
     def __repr__(self):
-        return f"<Chef(id={self.id}, name='{self.name}')>"
+        return "<Chef(id=%s, name='%s')>" % (self.id, self.name)
 
 
 class Pizza(Base):
     __tablename__ = 'pizzas'
     
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    chef_id = Column(Integer, ForeignKey('chefs.id'), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    id: Mapped[int] = Column(Integer, primary_key=True, autoincrement=True)
+    chef_id: Mapped[int] = Column(Integer, ForeignKey('chefs.id'), nullable=False, index=True)
+    created_at: Mapped[Optional[datetime]] = Column(DateTime, default=datetime.utcnow, server_default=func.current_timestamp())
     
     # Relationships
-    chef = relationship("Chef", back_populates="pizzas")
-    images = relationship("PizzaImage", back_populates="pizza", cascade="all, delete-orphan")
-    review = relationship("PizzaReview", back_populates="pizza", uselist=False, cascade="all, delete-orphan")
+    chef: Mapped["Chef"] = relationship("Chef", back_populates="pizzas")
+    images: Mapped[List["PizzaImage"]] = relationship("PizzaImage", back_populates="pizza", cascade="all, delete-orphan")
+    review: Mapped[Optional["PizzaReview"]] = relationship("PizzaReview", back_populates="pizza", uselist=False, cascade="all, delete-orphan")
     
     def __repr__(self):
-        return f"<Pizza(id={self.id}, chef_id={self.chef_id})>"
+        return "<Pizza(id=%s, chef_id=%s)>" % (self.id, self.chef_id)
 
 
 class PizzaImage(Base):
     __tablename__ = 'pizza_images'
     
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    pizza_id = Column(Integer, ForeignKey('pizzas.id'), nullable=False)
-    image_path = Column(String(500), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    id: Mapped[int] = Column(Integer, primary_key=True, autoincrement=True)
+    pizza_id: Mapped[int] = Column(Integer, ForeignKey('pizzas.id'), nullable=False, index=True)
+    image_path: Mapped[str] = Column(String(500), nullable=False)
+    created_at: Mapped[Optional[datetime]] = Column(DateTime, default=datetime.utcnow, server_default=func.current_timestamp())
     
     # Relationship
-    pizza = relationship("Pizza", back_populates="images")
+    pizza: Mapped["Pizza"] = relationship("Pizza", back_populates="images")
     
     def __repr__(self):
-        return f"<PizzaImage(id={self.id}, pizza_id={self.pizza_id}, image_path='{self.image_path}')>"
+        return "<PizzaImage(id=%s, pizza_id=%s, image_path='%s')>" % (self.id, self.pizza_id, self.image_path)
 
 
 class ReviewCategory(Base):
     __tablename__ = 'review_categories'
     
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    name = Column(String(100), nullable=False, unique=True)
+    id: Mapped[int] = Column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = Column(String(100), nullable=False, unique=True)
     
     # Relationship
-    scores = relationship("PizzaReviewScore", back_populates="category", cascade="all, delete-orphan")
+    scores: Mapped[List["PizzaReviewScore"]] = relationship("PizzaReviewScore", back_populates="category", cascade="all, delete-orphan")
     
     def __repr__(self):
-        return f"<ReviewCategory(id={self.id}, name='{self.name}')>"
+        return "<ReviewCategory(id=%s, name='%s')>" % (self.id, self.name)
 
 
 class PizzaReview(Base):
     __tablename__ = 'pizza_review'
     
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    pizza_id = Column(Integer, ForeignKey('pizzas.id'), nullable=False)
-    review_summary = Column(String(1000), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    id: Mapped[int] = Column(Integer, primary_key=True, autoincrement=True)
+    pizza_id: Mapped[int] = Column(Integer, ForeignKey('pizzas.id'), nullable=False, index=True)
+    review_summary: Mapped[str] = Column(String(1000), nullable=False)
+    created_at: Mapped[Optional[datetime]] = Column(DateTime, default=datetime.utcnow, server_default=func.current_timestamp())
     
     # Relationships
-    pizza = relationship("Pizza", back_populates="review")
-    scores = relationship("PizzaReviewScore", back_populates="review", cascade="all, delete-orphan")
+    pizza: Mapped["Pizza"] = relationship("Pizza", back_populates="review")
+    scores: Mapped[List["PizzaReviewScore"]] = relationship("PizzaReviewScore", back_populates="review", cascade="all, delete-orphan")
     
     def __repr__(self):
-        return f"<PizzaReview(id={self.id}, pizza_id={self.pizza_id})>"
+        return "<PizzaReview(id=%s, pizza_id=%s)>" % (self.id, self.pizza_id)
 
 
 class PizzaReviewScore(Base):
     __tablename__ = 'pizza_review_scores'
+    __table_args__ = (
+        # One score per category per review; also serves the review -> category join
+        Index('ix_scores_review_category', 'pizza_review_id', 'category_id', unique=True),
+    )
     
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    pizza_review_id = Column(Integer, ForeignKey('pizza_review.id'), nullable=False)
-    category_id = Column(Integer, ForeignKey('review_categories.id'), nullable=False)
-    score = Column(Integer, nullable=False)  # 1-5 scale
+    id: Mapped[int] = Column(Integer, primary_key=True, autoincrement=True)
+    pizza_review_id: Mapped[int] = Column(Integer, ForeignKey('pizza_review.id'), nullable=False, index=True)
+    category_id: Mapped[int] = Column(Integer, ForeignKey('review_categories.id'), nullable=False, index=True)
+    score: Mapped[int] = Column(Integer, nullable=False)  # 1-5 scale
     
     # Relationships
-    review = relationship("PizzaReview", back_populates="scores")
-    category = relationship("ReviewCategory", back_populates="scores")
+    review: Mapped["PizzaReview"] = relationship("PizzaReview", back_populates="scores")
+    category: Mapped["ReviewCategory"] = relationship("ReviewCategory", back_populates="scores")
     
     def __repr__(self):
-        return f"<PizzaReviewScore(review_id={self.pizza_review_id}, category_id={self.category_id}, score={self.score})>"
+        return "<PizzaReviewScore(review_id=%s, category_id=%s, score=%s)>" % (self.pizza_review_id, self.category_id, self.score)
+
+
+# Hot read paths as cached lambda statements: SQL compilation and loader option
+# processing happen once, later calls only bind new parameters
+_get_chef_by_id = lambda_stmt(lambda: select(Chef).where(Chef.id == bindparam("chef_id")))
+
+_get_pizza_images = lambda_stmt(
+    lambda: select(PizzaImage).where(PizzaImage.pizza_id == bindparam("pizza_id"))
+)
+
+_get_pizzas_by_chef = lambda_stmt(
+    lambda: select(Pizza).options(
+        selectinload(Pizza.chef),
+        selectinload(Pizza.images),
+        selectinload(Pizza.review).defer(PizzaReview.review_summary)
+    ).where(Pizza.chef_id == bindparam("chef_id"))
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune each new SQLite connection: WAL journaling, relaxed fsync, bigger in-memory caches"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-131072")  # 128 MB, keeps B-tree interior pages hot
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=1073741824")  # 1 GB, covers the whole file for pointer reads
+        # SQLite ignores FOREIGN KEY constraints unless asked; with this on, writes that
+        # reference a missing chef/pizza/review/category raise IntegrityError
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
 
 
 class DatabaseManager:
@@ -108,9 +147,30 @@ class DatabaseManager:
             db_path = os.getenv("DB_PATH", "pizzatron.db")
         
         self.db_path = db_path
-        self.engine = create_engine(f'sqlite:///{db_path}')
+        self.engine = create_engine(
+            f'sqlite:///{db_path}',
+            connect_args={"check_same_thread": False},
+            future=True,
+            # Keep warm connections around instead of reopening the file (and
+            # re-running the pragmas) per session. SQLite allows one writer and
+            # many WAL readers, so short write transactions are the safe pattern.
+            poolclass=QueuePool,
+            pool_size=5,
+            max_overflow=10,
+            # Room for every statement variant (lambda statements, loader options) in the
+            # engine-wide compiled SQL cache so hot queries are never recompiled
+            query_cache_size=1200
+        )
+        event.listen(self.engine, "connect", _set_sqlite_pragmas)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
+        # Bumped whenever review categories are written, so cached copies can be invalidated
+        self.categories_version = 0
+        
+        # Review category id -> name; the table is tiny and only written by seed_database,
+        # so it is read once and dropped whenever categories_version is bumped
+        self._category_by_id: Optional[Dict[int, str]] = None
+        
     def create_tables(self):
         """Create all tables if they don't exist"""
         Base.metadata.create_all(bind=self.engine)
@@ -119,172 +179,182 @@ class DatabaseManager:
         """Get a database session"""
         return self.SessionLocal()
     
+    @contextmanager
+    def session_scope(self) -> Iterator[Session]:
+        """Run a unit of work in one session and transaction: commit on success, rollback on error"""
+        # Objects are handed back to callers after the session closes, so keep their loaded state
+        session = self.SessionLocal(expire_on_commit=False)
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    
     def seed_database(self):
         """Seed the database with review categories only"""
-        session = self.get_session()
         try:
-            # Check if review categories already exist
-            if session.query(ReviewCategory).count() > 0:
-                print("Review categories already exist, skipping seed.")
-                return
+            with self.session_scope() as session:
+                # Check if review categories already exist
+                if session.query(ReviewCategory).count() > 0:
+                    print("Review categories already exist, skipping seed.")
+                    return
+                    
+                # Create review categories (only essential data) in a single executemany
+                category_names = [
+                    "Shape",
+                    "Crust Quality",
+                    "Presentation",
+                    "Bake Quality",
+                    "Flavor (estimated)",
+                    "Overall"
+                ]
                 
-            # Create review categories (only essential data)
-            categories = [
-                ReviewCategory(name="Shape"),
-                ReviewCategory(name="Crust Quality"),
-                ReviewCategory(name="Presentation"),
-                ReviewCategory(name="Bake Quality"),
-                ReviewCategory(name="Flavor (estimated)"),
-                ReviewCategory(name="Overall")
-            ]
-            
-            session.add_all(categories)
-            session.commit()
-            
-            print("Review categories seeded successfully!")
-            
+                session.execute(
+                    ReviewCategory.__table__.insert(),
+                    [{"name": name} for name in category_names]
+                )
         except Exception as e:
-            session.rollback()
             print(f"Error seeding review categories: {e}")
             raise
-        finally:
-            session.close()
+        
+        self.categories_version += 1
+        self._category_by_id = None
+        print("Review categories seeded successfully!")
     
     def initialize_database(self):
         """Initialize the database by creating tables and seeding if needed"""
         self.create_tables()
         self.seed_database()
     
+    def get_category_names(self) -> Dict[int, str]:
+        """Get review category names keyed by id, cached until the categories are next written"""
+        if self._category_by_id is None:
+            with self.get_session() as session:
+                self._category_by_id = dict(session.execute(
+                    select(ReviewCategory.id, ReviewCategory.name).order_by(ReviewCategory.id)
+                ).all())
+        return self._category_by_id
+    
     # Query methods for chefs
     def get_all_chefs(self) -> List[Chef]:
         """Get all chefs"""
-        session = self.get_session()
-        try:
+        with self.get_session() as session:
             return session.query(Chef).options(
-                joinedload(Chef.pizzas).joinedload(Pizza.images)
+                selectinload(Chef.pizzas).selectinload(Pizza.images)
             ).all()
-        finally:
-            session.close()
     
     def get_chef_by_id(self, chef_id: int) -> Optional[Chef]:
         """Get a chef by ID"""
-        session = self.get_session()
-        try:
-            return session.query(Chef).filter(Chef.id == chef_id).first()
-        finally:
-            session.close()
+        with self.get_session() as session:
+            return session.execute(_get_chef_by_id, {"chef_id": chef_id}).scalar_one_or_none()
     
     def create_chef(self, name: str, image_path: str = None) -> Chef:
         """Create a new chef"""
-        session = self.get_session()
-        try:
+        with self.session_scope() as session:
             chef = Chef(name=name, image_path=image_path)
             session.add(chef)
-            session.commit()
-            session.refresh(chef)
-            return chef
-        except Exception as e:
-            session.rollback()
-            raise
-        finally:
-            session.close()
+            # Flush fills the id from lastrowid and created_at from its Python-side default
+            session.flush()
+        return chef
     
     # Query methods for pizzas
     def get_all_pizzas(self) -> List[Pizza]:
-        """Get all pizzas with their chef information and reviews"""
-        session = self.get_session()
-        try:
+        """Get all pizzas with their chef, images and review (review summary and scores are not loaded)"""
+        with self.get_session() as session:
             return session.query(Pizza).options(
-                joinedload(Pizza.chef),
-                joinedload(Pizza.images),
-                joinedload(Pizza.review).joinedload(PizzaReview.scores).joinedload(PizzaReviewScore.category)
+                selectinload(Pizza.chef),
+                selectinload(Pizza.images),
+                selectinload(Pizza.review).defer(PizzaReview.review_summary)
+            ).all()
+    
+    def get_all_pizzas_rows(self) -> List[Row]:
+        """Get flat pizza/chef/image rows (one per image) without building ORM objects"""
+        with self.get_session() as session:
+            return session.execute(
+                select(
+                    Pizza.id,
+                    Pizza.chef_id,
+                    Pizza.created_at,
+                    Chef.name.label("chef_name"),
+                    PizzaImage.id.label("image_id"),
+                    PizzaImage.image_path,
+                    PizzaImage.created_at.label("image_created_at")
+                )
+                .join(Chef, Pizza.chef_id == Chef.id)
+                .outerjoin(PizzaImage, PizzaImage.pizza_id == Pizza.id)
+                .order_by(Pizza.id, PizzaImage.id)
             ).all()
-        finally:
-            session.close()
     
     def get_pizzas_by_chef(self, chef_id: int) -> List[Pizza]:
-        """Get all pizzas by a specific chef with reviews"""
-        session = self.get_session()
-        try:
-            return session.query(Pizza).options(
-                joinedload(Pizza.chef),
-                joinedload(Pizza.images),
-                joinedload(Pizza.review).joinedload(PizzaReview.scores).joinedload(PizzaReviewScore.category)
-            ).filter(Pizza.chef_id == chef_id).all()
-        finally:
-            session.close()
+        """Get all pizzas by a specific chef with images and review (review summary and scores are not loaded)"""
+        with self.get_session() as session:
+            return session.execute(_get_pizzas_by_chef, {"chef_id": chef_id}).scalars().all()
     
     def create_pizza(self, chef_id: int) -> Pizza:
         """Create a new pizza"""
-        session = self.get_session()
-        try:
+        with self.session_scope() as session:
             pizza = Pizza(chef_id=chef_id)
             session.add(pizza)
-            session.commit()
-            session.refresh(pizza)
-            return pizza
-        except Exception as e:
-            session.rollback()
-            raise
-        finally:
-            session.close()
+            session.flush()
+        return pizza
     
     # Query methods for pizza images
     def get_pizza_images(self, pizza_id: int) -> List[PizzaImage]:
         """Get all images for a specific pizza"""
-        session = self.get_session()
-        try:
-            return session.query(PizzaImage).filter(PizzaImage.pizza_id == pizza_id).all()
-        finally:
-            session.close()
+        with self.get_session() as session:
+            return session.execute(_get_pizza_images, {"pizza_id": pizza_id}).scalars().all()
     
     def add_pizza_image(self, pizza_id: int, image_path: str) -> PizzaImage:
         """Add an image to a pizza"""
-        session = self.get_session()
-        try:
+        with self.session_scope() as session:
             pizza_image = PizzaImage(pizza_id=pizza_id, image_path=image_path)
             session.add(pizza_image)
-            session.commit()
-            session.refresh(pizza_image)
-            return pizza_image
-        except Exception as e:
-            session.rollback()
-            raise
-        finally:
-            session.close()
+            session.flush()
+        return pizza_image
     
     # Complex queries
     def get_chef_with_pizzas(self, chef_id: int) -> Optional[Chef]:
         """Get a chef with all their pizzas and pizza images"""
-        session = self.get_session()
-        try:
+        with self.get_session() as session:
             return session.query(Chef).options(
-                joinedload(Chef.pizzas).joinedload(Pizza.images)
+                selectinload(Chef.pizzas).selectinload(Pizza.images)
             ).filter(Chef.id == chef_id).first()
-        finally:
-            session.close()
     
     def get_pizza_with_images(self, pizza_id: int) -> Optional[Pizza]:
-        """Get a pizza with all its images and review"""
-        session = self.get_session()
-        try:
+        """Get a pizza with all its images and review (score category names via get_category_names)"""
+        with self.get_session() as session:
             return session.query(Pizza).options(
                 joinedload(Pizza.chef),
-                joinedload(Pizza.images),
-                joinedload(Pizza.review).joinedload(PizzaReview.scores).joinedload(PizzaReviewScore.category)
+                selectinload(Pizza.images),
+                selectinload(Pizza.review).selectinload(PizzaReview.scores)
             ).filter(Pizza.id == pizza_id).first()
-        finally:
-            session.close()
 
 
-# Global database manager instance
-db_manager = DatabaseManager()
+# Global database manager instance, created on first use so importing the models
+# doesn't open the database file
+_db_manager: Optional[DatabaseManager] = None
+
+def _mgr() -> DatabaseManager:
+    """Get the global database manager, creating it on first call"""
+    global _db_manager
+    if _db_manager is None:
+        _db_manager = DatabaseManager()
+    return _db_manager
+
+def __getattr__(name: str):
+    # Keeps `from src.db import db_manager` working while deferring construction
+    if name == "db_manager":
+        return _mgr()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Convenience functions for easy access
 def init_db():
     """Initialize the database"""
-    db_manager.initialize_database()
+    _mgr().initialize_database()
 
 def get_db_session():
     """Get a database session for custom queries"""
-    return db_manager.get_session()
\ No newline at end of file
+    return _mgr().get_session()
\ No newline at end of file